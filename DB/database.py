@@ -1,22 +1,20 @@
-from sqlalchemy import create_engine
+from sqlalchemy import inspect, text
 from models.model import Base
-import os
-from dotenv import load_dotenv
+from DB.connection import get_engine
 
-# Load environment variables from .env file
-load_dotenv()
 
-# Database connection URL (expected in .env as DATABASE_URL)
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-
-def create_table():
+async def create_table():
     """
     Create database tables defined in SQLAlchemy ORM models.
 
     This function:
-    - Creates a new SQLAlchemy engine using the DATABASE_URL from environment variables.
-    - Uses SQLAlchemy's metadata to create all tables defined in `Base`.
+    - Reuses the application's shared async engine from `DB.connection.get_engine`.
+    - Uses SQLAlchemy's metadata to create all tables defined in `Base`
+      (run through `run_sync` since DDL helpers are synchronous).
+    - On PostgreSQL, enables the `pg_trgm` extension first; the trigram
+      index on `books.author` depends on it.
+    - Skips all DDL when every model table already exists (one inspection
+      round-trip), so restarts against a provisioned database do no schema work.
 
     Notes
     -----
@@ -29,8 +27,16 @@ def create_table():
     sqlalchemy.exc.OperationalError
         If the database connection cannot be established.
     """
-    # Initialize SQLAlchemy engine for the given database
-    engine = create_engine(DATABASE_URL)
+    # Shared engine: DDL runs on the same pool as request sessions
+    engine = get_engine()
 
     # Create all tables defined on the declarative Base
-    Base.metadata.create_all(engine)
+    async with engine.begin() as conn:
+        existing = await conn.run_sync(
+            lambda sync_conn: set(inspect(sync_conn).get_table_names())
+        )
+        if existing.issuperset(Base.metadata.tables):
+            return
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.run_sync(Base.metadata.create_all)
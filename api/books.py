@@ -1,14 +1,24 @@
-from fastapi import APIRouter, status, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, status, Query, Header, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from typing import Optional
+from sqlalchemy import select, update, func, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
 
+import hashlib
+import orjson
 import traceback
 
 from DB.connection import db_dependency
 from schema.request_schema import BookSchema, BookUpdateSchema
-from models.model import Book
+from models.model import Book, BookStatus
 from utils.helpers import (
-    find_by_title_author,
+    apply_detail_loaders,
+    apply_list_loaders,
+    duplicate_cache_enabled,
+    forget_duplicate,
+    insert_book_if_absent,
+    is_title_author_conflict,
     response_format_success,
     response_format_failure,
 )
@@ -20,6 +30,74 @@ router = APIRouter()
 # Application logger
 logger = get_logger()
 
+# Media type for streamed list responses, and rows fetched per DB round-trip
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 200
+
+# Page size for JSON list requests that pass no `limit`
+DEFAULT_PAGE_SIZE = 50
+
+# Client-side caching policy for single-book reads
+BOOK_CACHE_CONTROL = "public, max-age=60"
+
+# Columns a PUT may change: schema fields that map onto Book columns
+_UPDATABLE = frozenset(BookUpdateSchema.model_fields) & frozenset(
+    Book.__table__.columns.keys()
+)
+
+# Statements for the hot query shapes, built once at import. Values are
+# passed as bound parameters, so each shape compiles once and is then served
+# from the engine's compiled-SQL cache.
+#
+# Only the columns exposed by the API are selected, returning plain rows
+# instead of hydrated ORM objects. List/detail reads go through the eager-loader
+# hooks; once relationships are listed there, select Book entities instead.
+_book_columns = (
+    Book.id,
+    Book.title,
+    Book.author,
+    Book.published_year,
+    Book.genre,
+    Book.available,
+)
+_by_id_columns = _book_columns + (Book.updated_at,)
+_active_books_stmt = apply_list_loaders(
+    select(*_book_columns).where(Book.status != BookStatus.TERMINATED)
+)
+_get_by_id_stmt = apply_detail_loaders(
+    select(*_by_id_columns).where(
+        Book.id == bindparam("book_id"), Book.status != BookStatus.TERMINATED
+    )
+)
+_active_id_stmt = select(Book.id).where(
+    Book.id == bindparam("book_id"), Book.status != BookStatus.TERMINATED
+)
+_title_author_by_id_stmt = select(Book.title, Book.author).where(
+    Book.id == bindparam("book_id")
+)
+_status_by_id_stmt = select(Book.status).where(Book.id == bindparam("book_id"))
+_terminate_stmt = (
+    update(Book)
+    .where(Book.id == bindparam("book_id"), Book.status != BookStatus.TERMINATED)
+    .values(status=BookStatus.TERMINATED)
+    .returning(Book.id)
+    .execution_options(synchronize_session=False)
+)
+
+
+def _book_fields(row, columns=_book_columns) -> dict:
+    """
+    API fields of one result row.
+
+    Column rows map straight onto them; with eager loaders configured, rows
+    carry a Book entity (ORM session) or all of its columns (Core stream).
+    """
+    entity = row[0]
+    if isinstance(entity, Book):
+        return {column.key: getattr(entity, column.key) for column in columns}
+    mapping = row._mapping
+    return {column.key: mapping[column.key] for column in columns}
+
 
 @router.post("")
 async def add_book(book: BookSchema, session: db_dependency):
@@ -35,42 +113,67 @@ async def add_book(book: BookSchema, session: db_dependency):
 
     Returns
     -------
-    JSONResponse
+    ORJSONResponse
         - 201 Created if successful.
         - 409 Conflict if title + author already exists.
     """
-    # Check for duplicates (title + author)
-    if find_by_title_author(book.title, book.author, session):
+    # Insert unless title + author already exist (enforced by a unique index).
+    # The payload was just validated, so dump it without serializer warning checks.
+    book_id = await insert_book_if_absent(
+        book.model_dump(mode="python", warnings=False), session
+    )
+
+    if book_id is None:
         logger.warning(
-            f"Book already exists: title='{book.title}', author='{book.author}'"
+            "Book already exists: title='%s', author='%s'", book.title, book.author
         )
-        return JSONResponse(
+        return ORJSONResponse(
             content=response_format_failure("Title and Author already present"),
             status_code=status.HTTP_409_CONFLICT,
         )
 
-    # Add new book to session (commit handled by dependency)
-    session.add(Book(**book.model_dump()))
-
     logger.info(
-        f"Book created successfully: title='{book.title}', author='{book.author}'"
+        "Book created successfully: title='%s', author='%s'", book.title, book.author
     )
-    return JSONResponse(
+    return ORJSONResponse(
         content=response_format_success("Sucessfully created"),
         status_code=status.HTTP_201_CREATED,
     )
 
 
+async def _stream_books(engine: AsyncEngine, query):
+    """
+    Yield books matching `query` as NDJSON, one batch of rows at a time.
+
+    Uses its own connection (rather than the request session, which is closed
+    once the handler returns) and a server-side cursor, so memory stays flat
+    regardless of how many rows match.
+    """
+    async with engine.connect() as conn:
+        result = await conn.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield b"".join(orjson.dumps(_book_fields(row)) + b"\n" for row in rows)
+
+
 @router.get("")
 async def get_book(
     session: db_dependency,
     author: Optional[str] = None,
     genre: Optional[str] = None,
     available: Optional[bool] = None,
-    start: Optional[int] = Query(None, ge=0, description="Starting index (offset)"),
+    after_id: Optional[int] = Query(
+        None, ge=0, description="Return books with id greater than this cursor"
+    ),
+    start: Optional[int] = Query(
+        None, ge=0, deprecated=True, description="Starting index (offset); use after_id"
+    ),
     limit: Optional[int] = Query(
         None, ge=1, le=100, description="Number of items to fetch"
     ),
+    include_total: bool = Query(
+        False, description="Also count all matching books (JSON responses only)"
+    ),
+    accept: Optional[str] = Header(None),
 ):
     """
     Retrieve a list of books with optional filters and pagination.
@@ -85,77 +188,116 @@ async def get_book(
         Filter by genre.
     available : bool, optional
         Filter by availability.
+    after_id : int, optional
+        Keyset cursor (>= 0); pass the previous page's `next_cursor`.
     start : int, optional
-        Pagination offset (>= 0).
+        Deprecated pagination offset (>= 0), used only when `after_id` is unset.
     limit : int, optional
-        Number of items to fetch (1–100).
+        Number of items to fetch (1–100); defaults to 50.
+    include_total : bool, optional
+        Add `total_items` to the pagination metadata (costs an extra COUNT query).
+    accept : str, optional
+        `Accept` header; `application/x-ndjson` streams all matching books
+        when no `after_id`, `start` or `limit` is given.
 
     Returns
     -------
-    dict
-        Success response with books and optional pagination metadata.
+    ORJSONResponse or StreamingResponse
+        Success response with one page of books and pagination metadata, or
+        an NDJSON stream (one book per line) for unpaginated NDJSON requests.
+
+    Notes
+    -----
+    JSON responses are always one bounded page: without `after_id` or
+    `start` the first keyset page (50 books by default) is returned. Keyset
+    pagination seeks on the primary key, so deep pages cost the same as the
+    first one. The `start` offset path is kept for backward compatibility and
+    scans past `start` rows. Full pulls must page or stream NDJSON, which keeps
+    memory flat.
     """
-    query = session.query(Book)
+    # Start from non-terminated books (soft-deleted rows are excluded)
+    query = _active_books_stmt
 
     # Apply filters if provided
     if author is not None:
-        query = query.filter(Book.author.ilike(f"%{author}%"))
+        # Case-insensitive "contains"; the %...% pattern is built in SQL around the
+        # bound value (wildcards in it are escaped) and served by the trigram index
+        query = query.where(Book.author.icontains(author, autoescape=True))
     if genre is not None:
-        query = query.filter(Book.genre == genre)
+        query = query.where(Book.genre == genre)
     if available is not None:
-        query = query.filter(Book.available == available)
+        query = query.where(Book.available == available)
+
+    query = query.order_by(Book.id)
 
-    # Exclude soft-deleted (terminated) books
-    query = query.filter(Book.status != "Terminated")
+    # Unpaginated pulls can be arbitrarily large: stream them when the client accepts NDJSON
+    unpaginated = after_id is None and start is None and limit is None
+    if unpaginated and accept is not None and NDJSON_MEDIA_TYPE in accept:
+        logger.info(
+            "Streaming books (filters: author=%s, genre=%s, available=%s)",
+            author, genre, available,
+        )
+        return StreamingResponse(
+            _stream_books(session.bind, query), media_type=NDJSON_MEDIA_TYPE
+        )
 
-    total_items = query.count()
+    # JSON responses are always one bounded page. Keyset pagination takes
+    # precedence over the deprecated offset path and is the default.
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    keyset = start is None or after_id is not None
+    if keyset and after_id is None:
+        after_id = 0  # First page
+
+    # COUNT(*) is a separate round-trip, so only run it when asked for
+    total_items = None
+    if include_total:
+        total_items = await session.scalar(
+            select(func.count()).select_from(query.subquery())
+        )
 
-    # Apply pagination only if both start and limit are set
-    if start is not None and limit is not None:
+    if keyset:
+        query = query.where(Book.id > after_id).limit(limit)
+    else:
         query = query.offset(start).limit(limit)
 
-    results = query.all()
-
-    # Convert ORM objects into serializable dictionaries
-    items = [
-        {
-            "id": row.id,
-            "title": row.title,
-            "author": row.author,
-            "published_year": row.published_year,
-            "genre": row.genre,
-            "available": row.available,
-        }
-        for row in results
-    ]
-
-    # Paginated vs. full response payload
-    if start is not None and limit is not None:
-        payload = {
-            "data": items,
-            "pagination": {
-                "start": start,
-                "limit": limit,
-                "total_items": total_items,
-            },
-        }
-        logger.info(
-            f"Fetched {len(items)}/{total_items} books "
-            f"(filters: author={author}, genre={genre}, available={available})"
-        )
+    # Rows already hold exactly the response fields; emit them as dicts
+    items = [_book_fields(row) for row in await session.execute(query)]
+
+    pagination = {"limit": limit, "has_more": len(items) == limit}
+    if total_items is not None:
+        pagination["total_items"] = total_items
+    if keyset:
+        pagination["after_id"] = after_id
+        pagination["next_cursor"] = items[-1]["id"] if items else None
     else:
-        payload = {"items": items}
-        logger.info(
-            f"Fetched {len(items)}/{total_items} books "
-            f"(filters: author={author}, genre={genre}, available={available}, "
-            f"start={start}, limit={limit})"
-        )
+        pagination["start"] = start
+    payload = {"data": items, "pagination": pagination}
+    logger.info(
+        "Fetched %d books (total_items=%s) "
+        "(filters: author=%s, genre=%s, available=%s)",
+        len(items), total_items, author, genre, available,
+    )
 
-    return response_format_success(message="Successfully Fetched", data=payload)
+    # Hand orjson the payload directly; a plain dict return would first be walked
+    # item by item by FastAPI's jsonable_encoder
+    return ORJSONResponse(
+        content=response_format_success(message="Successfully Fetched", data=payload)
+    )
+
+
+def _book_etag(book_id: int, updated_at) -> str:
+    """Strong ETag for a book version; changes whenever the row is updated."""
+    digest = hashlib.blake2s(f"{book_id}:{updated_at}".encode()).hexdigest()
+    return f'"{digest}"'
 
 
 @router.get("/{id}")
-async def get_book_by_id(id: int, session: db_dependency):
+async def get_book_by_id(
+    id: int,
+    session: db_dependency,
+    if_none_match: Optional[str] = Header(None),
+):
     """
     Retrieve a book by its ID.
 
@@ -165,35 +307,55 @@ async def get_book_by_id(id: int, session: db_dependency):
         Book ID.
     session : db_dependency
         Database session.
+    if_none_match : str, optional
+        `If-None-Match` header with ETag(s) from a previous response.
 
     Returns
     -------
-    dict or JSONResponse
-        - 200 Success with book details.
+    ORJSONResponse or Response
+        - 200 Success with book details, `ETag` and `Cache-Control` headers.
+        - 304 Not Modified (empty body) if the client's ETag is current.
         - 404 Not Found if ID does not exist.
     """
-    data = session.query(Book).filter(Book.id == id, Book.status != "Terminated").first()
+    # unique(): required once joined eager loads add collection rows
+    data = (await session.execute(_get_by_id_stmt, {"book_id": id})).unique().first()
 
     if not data:
-        logger.warning(f"Book not found (id={id})")
-        return JSONResponse(
+        logger.warning("Book not found (id=%s)", id)
+        return ORJSONResponse(
             content=response_format_failure("id not found"),
             status_code=status.HTTP_404_NOT_FOUND,
         )
 
+    book = _book_fields(data, _by_id_columns)
+    etag = _book_etag(id, book["updated_at"])
+    headers = {"ETag": etag, "Cache-Control": BOOK_CACHE_CONTROL}
+
+    # Conditional GET: skip serialization if the client already has this version.
+    # If-None-Match uses weak comparison (RFC 9110), so a W/ prefix is ignored.
+    if if_none_match is not None and (
+        if_none_match.strip() == "*"
+        or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    ):
+        logger.info("Book not modified (id=%s)", id)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
     response = {
-        "title": data.title,
-        "author": data.author,
-        "published_year": data.published_year,
-        "genre": data.genre,
-        "available": data.available,
+        "title": book["title"],
+        "author": book["author"],
+        "published_year": book["published_year"],
+        "genre": book["genre"],
+        "available": book["available"],
     }
-    logger.info(f"Fetched book details successfully (id={id})")
-    return response_format_success(message="Successfully Fetched", data=response)
+    logger.info("Fetched book details successfully (id=%s)", id)
+    return ORJSONResponse(
+        content=response_format_success(message="Successfully Fetched", data=response),
+        headers=headers,
+    )
 
 
 @router.put("/{id}", status_code=status.HTTP_200_OK)
-def update_book(id: int, book_data: BookUpdateSchema, session: db_dependency):
+async def update_book(id: int, book_data: BookUpdateSchema, session: db_dependency):
     """
     Update an existing book record.
 
@@ -208,49 +370,82 @@ def update_book(id: int, book_data: BookUpdateSchema, session: db_dependency):
 
     Returns
     -------
-    dict or JSONResponse
+    ORJSONResponse
         - 200 Success with updated ID.
         - 200 with failure message if no fields provided.
         - 404 Not Found if ID does not exist or is terminated.
+        - 409 Conflict if the new title + author belong to another book.
     """
-    # Only update if book exists and not terminated
-    book = (
-        session.query(Book)
-        .filter(Book.id == id, Book.status != "Terminated")
-        .first()
+    # Allowlist applied by the serializer, so no per-field checks are needed here
+    updates = book_data.model_dump(
+        mode="python", include=_UPDATABLE, exclude_unset=True, warnings=False
     )
 
-    if not book:
-        logger.warning(f"Book not found for update (id={id})")
-        return JSONResponse(
+    # A rename frees the old title/author pair; remember it to evict from the
+    # duplicate cache (only read when that cache is on)
+    previous = None
+    if duplicate_cache_enabled() and updates.keys() & {"title", "author"}:
+        previous = (
+            await session.execute(_title_author_by_id_stmt, {"book_id": id})
+        ).first()
+
+    if updates:
+        # Single UPDATE ... RETURNING: only matches existing, non-terminated books
+        stmt = (
+            update(Book)
+            .where(Book.id == id, Book.status != BookStatus.TERMINATED)
+            .values(**updates)
+            .returning(Book.id)
+            .execution_options(synchronize_session=False)
+        )
+        # The UPDATE is the request's only write, so a title/author clash just
+        # rolls the whole transaction back (no savepoint round-trips)
+        try:
+            found = (await session.execute(stmt)).first() is not None
+        except IntegrityError as e:
+            if not is_title_author_conflict(e):
+                raise
+            await session.rollback()
+            logger.warning("Title and Author already present (id=%s)", id)
+            return ORJSONResponse(
+                content=response_format_failure("Title and Author already present"),
+                status_code=status.HTTP_409_CONFLICT,
+            )
+    else:
+        found = (
+            await session.execute(_active_id_stmt, {"book_id": id})
+        ).first() is not None
+
+    if not found:
+        logger.warning("Book not found for update (id=%s)", id)
+        return ORJSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
             content=response_format_failure(message="Book with provided ID Not Found"),
         )
 
-    updates = book_data.model_dump(exclude_unset=True)
     if not updates:
-        logger.info(f"No updates provided for book (id={id})")
-        return JSONResponse(
+        logger.info("No updates provided for book (id=%s)", id)
+        return ORJSONResponse(
             status_code=status.HTTP_200_OK,
             content=response_format_failure("No changes provided", data={"id": id}),
         )
 
-    # Apply changes to the ORM object
-    for attr, value in updates.items():
-        if hasattr(book, attr):
-            setattr(book, attr, value)
-
-    # Re-add to session (not strictly needed, but safe)
-    session.add(book)
+    if previous is not None:
+        forget_duplicate(previous.title, previous.author)
+        forget_duplicate(
+            updates.get("title", previous.title), updates.get("author", previous.author)
+        )
 
-    logger.info(f"Book updated successfully (id={id}, updates={updates})")
-    return response_format_success("Successfully Updated", data={"id": id})
+    logger.info("Book updated successfully (id=%s, updates=%s)", id, updates)
+    return ORJSONResponse(
+        content=response_format_success("Successfully Updated", data={"id": id})
+    )
 
 
 @router.delete("/{id}")
 async def delete_book(id: int, session: db_dependency):
     """
-    Soft-delete a book by marking status as 'Terminated'.
+    Soft-delete a book by marking its status as terminated.
 
     Parameters
     ----------
@@ -261,31 +456,32 @@ async def delete_book(id: int, session: db_dependency):
 
     Returns
     -------
-    JSONResponse
+    ORJSONResponse
         - 200 Success if deleted or already terminated.
         - 404 Not Found if ID does not exist.
     """
-    data = session.query(Book).filter(Book.id == id).first()
-
-    if not data:
-        logger.warning(f"Book not found for delete (id={id})")
-        return JSONResponse(
-            status_code=status.HTTP_404_NOT_FOUND,
-            content=response_format_success(message="Book with provided ID Not Found"),
-        )
+    # Soft-delete by setting status instead of removing row
+    terminated = (await session.execute(_terminate_stmt, {"book_id": id})).first()
 
-    if data.status == "Terminated":
-        logger.info(f"Book already terminated (id={id})")
-        return JSONResponse(
+    if terminated is not None:
+        logger.info("Book terminated successfully (id=%s)", id)
+        return ORJSONResponse(
             status_code=status.HTTP_200_OK,
-            content=response_format_success(message="Book is already terminated"),
+            content=response_format_success(message="Successfully Deleted"),
         )
 
-    # Soft-delete by setting status instead of removing row
-    data.status = "Terminated"
+    # Nothing updated: tell apart a missing ID from an already terminated book
+    current_status = await session.scalar(_status_by_id_stmt, {"book_id": id})
+
+    if current_status is None:
+        logger.warning("Book not found for delete (id=%s)", id)
+        return ORJSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content=response_format_success(message="Book with provided ID Not Found"),
+        )
 
-    logger.info(f"Book terminated successfully (id={id})")
-    return JSONResponse(
+    logger.info("Book already terminated (id=%s)", id)
+    return ORJSONResponse(
         status_code=status.HTTP_200_OK,
-        content=response_format_success(message="Successfully Deleted"),
+        content=response_format_success(message="Book is already terminated"),
     )
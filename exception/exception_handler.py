@@ -1,9 +1,10 @@
 from fastapi import Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import SQLAlchemyError
 
 from utils.helpers import response_format_failure
+from schema.request_schema import PATTERN_ERROR_MESSAGES
 from logger.logging import get_logger
 
 
@@ -25,12 +26,18 @@ async def validation_error_handler(request: Request, exc: RequestValidationError
 
     Returns
     -------
-    JSONResponse
+    ORJSONResponse
         HTTP 422 response with a standardized error format.
     """
     errors = []
     # Extract human-readable messages from validation errors
     for err in exc.errors():
+        # Pattern mismatches carry the raw regex; report the field's message instead
+        if err.get("type") == "string_pattern_mismatch":
+            field = err.get("loc", ())[-1]
+            if field in PATTERN_ERROR_MESSAGES:
+                errors.append(PATTERN_ERROR_MESSAGES[field])
+                continue
         errors.append(err.get("msg").replace("Value error, ", ""))
 
     # Log warning with request details and error messages
@@ -39,7 +46,7 @@ async def validation_error_handler(request: Request, exc: RequestValidationError
     )
 
     # Return 422 response with concatenated error messages
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content=response_format_failure(message=" & ".join(errors)),
     )
@@ -58,7 +65,7 @@ async def value_error_handler(request: Request, exc: ValueError):
 
     Returns
     -------
-    JSONResponse
+    ORJSONResponse
         HTTP 400 response with the error message.
     """
     # Log warning with request details and exception string
@@ -66,7 +73,7 @@ async def value_error_handler(request: Request, exc: ValueError):
         f"ValueError on {request.method} {request.url}: {exc}"
     )
 
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_400_BAD_REQUEST,
         content={"error": str(exc)},  # Note: not using response_format_failure here
     )
@@ -85,7 +92,7 @@ async def sqlalchemy_error_handler(request: Request, exc: SQLAlchemyError):
 
     Returns
     -------
-    JSONResponse
+    ORJSONResponse
         HTTP 500 response with a generic failure message.
     """
     # Log full stack trace and request details
@@ -94,7 +101,7 @@ async def sqlalchemy_error_handler(request: Request, exc: SQLAlchemyError):
         exc_info=True,  # Includes stack trace in logs
     )
 
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content=response_format_failure(message="Something went wrong"),
     )
@@ -113,7 +120,7 @@ async def generic_exception_handler(request: Request, exc: Exception):
 
     Returns
     -------
-    JSONResponse
+    ORJSONResponse
         HTTP 500 response with a generic failure message.
     """
     # Log full stack trace and request details
@@ -122,7 +129,7 @@ async def generic_exception_handler(request: Request, exc: Exception):
         exc_info=True,
     )
 
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content=response_format_failure(message="Something went wrong"),
     )
@@ -1,16 +1,16 @@
+import atexit
+import functools
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
-from dotenv import load_dotenv
+import queue
 
-load_dotenv()
-
-LOGGER_NAME = os.getenv("APPLICATION_NAME")
 LOG_FILE_PATH = "/app/logs"
 MAX_BYTES = 5 * 1024 * 1024  # Maximum log file size before rotation (5 MB)
 BACKUP_COUNT = 5             # Number of backup log files to keep
 
 
+@functools.lru_cache(maxsize=1)
 def get_logger() -> logging.Logger:
     """
     Creates and returns an application-wide logger.
@@ -19,18 +19,24 @@ def get_logger() -> logging.Logger:
     When the log file reaches MAX_BYTES in size, it is rotated, and older
     files are renamed and kept up to BACKUP_COUNT copies.
 
+    Records are handed to the file handler through a QueueHandler, and a
+    background QueueListener thread does the actual writes and rotations,
+    so request handlers never block on disk I/O.
+
     Returns
     -------
     logging.Logger
-        Configured logger instance with a rotating file handler.
+        Configured logger instance feeding a queued rotating file handler.
 
     Notes
     -----
     - The log directory is created if it does not exist.
     - Log format includes timestamp, log level, logger name, and the message.
-    - Logging level is set to DEBUG (captures all logs).
-    - Multiple calls to `get_logger()` return the same logger instance
-      (avoids duplicate handlers).
+    - Logger name comes from APPLICATION_NAME and level from LOG_LEVEL
+      (default DEBUG); the environment is expected to be loaded by the caller.
+    - The listener is stopped at interpreter exit, flushing queued records.
+    - The result is cached: setup runs once per process and later calls
+      return the same logger instance (no duplicate handlers).
     """
 
     # Ensure log directory exists (creates if missing)
@@ -40,26 +46,30 @@ def get_logger() -> logging.Logger:
     log_file = os.path.join(LOG_FILE_PATH, "app.log")
 
     # Create or fetch the logger instance by name
-    logger_name = LOGGER_NAME
+    logger_name = os.getenv("APPLICATION_NAME")
     logger = logging.getLogger(logger_name)
-    logger.setLevel(logging.DEBUG)  # Capture DEBUG and above levels
+    logger.setLevel(os.getenv("LOG_LEVEL", "DEBUG").upper())  # e.g. INFO in production
+
+    handler = RotatingFileHandler(
+        filename=log_file,
+        maxBytes=MAX_BYTES,
+        backupCount=BACKUP_COUNT,
+        encoding="utf-8"
+    )
+    # Define log format
+    formatter = logging.Formatter(
+        "[%(asctime)s] [%(levelname)s] %(name)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+    handler.setFormatter(formatter)
 
-    # Avoid adding multiple handlers if logger already configured
-    if not logger.handlers:
-        handler = RotatingFileHandler(
-            filename=log_file,
-            maxBytes=MAX_BYTES,
-            backupCount=BACKUP_COUNT,
-            encoding="utf-8"
-        )
-        # Define log format
-        formatter = logging.Formatter(
-            "[%(asctime)s] [%(levelname)s] %(name)s - %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S"
-        )
-        handler.setFormatter(formatter)
+    # File writes happen on the listener thread, off the request path
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
 
-        # Attach the handler to the logger
-        logger.addHandler(handler)
+    # Attach the queue handler to the logger
+    logger.addHandler(QueueHandler(log_queue))
 
     return logger
\ No newline at end of file
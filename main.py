@@ -1,4 +1,10 @@
+from dotenv import load_dotenv
+
+# Load .env before importing app modules that read configuration at import
+load_dotenv()
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi.exceptions import RequestValidationError
@@ -8,7 +14,7 @@ import time
 
 from api import books
 from DB.database import create_table
-from DB.connection import db_dependency
+from DB.connection import db_dependency, get_engine
 from exception.exception_handler import (
     value_error_handler,
     validation_error_handler,
@@ -16,13 +22,19 @@ from exception.exception_handler import (
     generic_exception_handler,
 )
 
-# Initialize FastAPI application instance
-app = FastAPI()
+# Initialize FastAPI application instance (orjson-backed responses by default)
+app = FastAPI(default_response_class=ORJSONResponse)
 
 
 @app.on_event("startup")
-def startup_event():
-    create_table()
+async def startup_event():
+    await create_table()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Close pooled connections of the shared engine
+    await get_engine().dispose()
 
 
 # Record application start time for uptime calculation
@@ -30,7 +42,7 @@ start_time = time.time()
 
 
 @app.get("/health")
-def health(db: db_dependency):
+async def health(db: db_dependency):
     """
     Health check endpoint.
 
@@ -52,13 +64,14 @@ def health(db: db_dependency):
 
     Notes
     -----
-    - The database is checked using a simple `SELECT 1` query.
+    - The database is checked using a simple `SELECT 1` query, awaited on the
+      request's AsyncSession so the check never blocks the event loop.
     - Uptime is measured from the moment the application started.
     """
     uptime_seconds = int(time.time() - start_time)
     try:
         # Test DB connectivity
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         db_status = "up"
     except Exception as e:
         # Capture DB error and return as part of health status
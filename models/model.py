@@ -1,19 +1,68 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, Boolean, DateTime,  Enum
+from sqlalchemy import Column, Integer, SmallInteger, String, Boolean, DateTime,  Enum, Index, Computed, UniqueConstraint, text
 from sqlalchemy.sql import func
 
+import datetime
+import enum
+
 
 Base = declarative_base()
 
+
+class BookStatus(enum.IntEnum):
+    """Lifecycle state of a book, stored as a small integer code."""
+    PRESENT = 0
+    TERMINATED = 1
+
+
+def _utcnow():
+    # Naive UTC, matching the timezone-less DateTime columns
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+# Predicate shared by the partial indexes over active (non-terminated) books
+_ACTIVE_BOOK = f"status <> {BookStatus.TERMINATED:d}"
+
 class Book(Base):
     __tablename__ = "books"
+    __table_args__ = (
+        # Partial index for the genre/availability filters on active books
+        Index(
+            "idx_book_active_genre_avail",
+            "genre",
+            "available",
+            postgresql_where=text(_ACTIVE_BOOK),
+        ),
+        # Partial index over active ids: the list endpoint filters out terminated
+        # books and orders/seeks on id, so it can walk this instead of the table
+        Index(
+            "ix_books_active_id",
+            "id",
+            postgresql_where=text(_ACTIVE_BOOK),
+            sqlite_where=text(_ACTIVE_BOOK),
+        ),
+        # Trigram index so `author ILIKE '%...%'` can avoid a sequential scan (needs pg_trgm)
+        Index(
+            "idx_book_author_trgm",
+            "author",
+            postgresql_using="gin",
+            postgresql_ops={"author": "gin_trgm_ops"},
+        ),
+        # Title + author are unique case-insensitively; inserts rely on it for duplicate detection
+        UniqueConstraint("title_lc", "author_lc", name="uq_books_title_author"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String(255), nullable=False)
     author = Column(String(255), nullable=False)
+    # Lowercased copies maintained by the database, backing the unique constraint above
+    title_lc = Column(String(255), Computed("lower(title)", persisted=True), nullable=False)
+    author_lc = Column(String(255), Computed("lower(author)", persisted=True), nullable=False)
     published_year = Column(Integer, nullable=False)
-    genre = Column(Enum('fiction', 'non-fiction', 'science', 'history', 'other'), nullable=False)
+    genre = Column(Enum('fiction', 'non-fiction', 'science', 'history', 'other', name='book_genre'), nullable=False)
     available = Column(Boolean, default=True)
-    status = Column(String(20), default='Present')
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, onupdate=func.now())
\ No newline at end of file
+    status = Column(SmallInteger, nullable=False, default=BookStatus.PRESENT)
+    # Timestamps are bound parameters computed in Python, so INSERT/UPDATE SQL carries
+    # no SQL function calls; server_default still covers rows written outside the ORM
+    created_at = Column(DateTime, default=_utcnow, server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
\ No newline at end of file
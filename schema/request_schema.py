@@ -1,47 +1,39 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
+from typing import Annotated, Literal, Optional
 
 import datetime
 
 
+# Upper bound for published_year, evaluated once at import.
+# The process must be restarted after a year rollover to accept the new year.
+_CURRENT_YEAR = datetime.date.today().year
+
+# Constrained string types; patterns run in pydantic-core's compiled
+# validator instead of per-request Python validators
+TitleStr = Annotated[str, StringConstraints(min_length=1, max_length=255, pattern=r"\D")]
+AuthorStr = Annotated[str, StringConstraints(min_length=3, max_length=255, pattern=r"^\D+$")]
+
+# Messages reported for pattern mismatches, keyed by field name
+PATTERN_ERROR_MESSAGES = {
+    "title": "Title cannot be only numbers",
+    "author": "Author name cannot contain numbers",
+}
+
+
 class BookSchema(BaseModel):
-    title: str = Field(..., min_length=1, max_length=255, description="Book title must not be empty")
-    author: str = Field(..., min_length=3, max_length=255, description="Author name must be at least 3 characters")
-    published_year: int = Field(..., ge=1450, le=datetime.datetime.now().year, description="Year must be realistic")
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    title: TitleStr = Field(..., description="Book title must not be empty")
+    author: AuthorStr = Field(..., description="Author name must be at least 3 characters")
+    published_year: int = Field(..., ge=1450, le=_CURRENT_YEAR, description="Year must be realistic")
     genre: Literal['fiction', 'non-fiction', 'science', 'history', 'other']
     available: bool
-
-    # Custom validator for title
-    @field_validator("title")
-    def title_not_numeric(cls, v):
-        if v.isdigit():
-            raise ValueError("Title cannot be only numbers")
-        return v
-
-    # Custom validator for author
-    @field_validator("author")
-    def author_no_digits(cls, v):
-        if any(char.isdigit() for char in v):
-            raise ValueError("Author name cannot contain numbers")
-        return v
     
 class BookUpdateSchema(BaseModel):
-    title: Optional[str] = Field(None, min_length=1, max_length=255, description="Book title must be atleast 1 characters")
-    author: Optional[str] = Field(None, min_length=3, max_length=255, description="Author name must be at least 3 characters")
-    published_year: Optional[int] = Field(None, ge=1450, le=datetime.datetime.now().year, description="Year must be realistic")
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    title: Optional[TitleStr] = Field(None, description="Book title must be atleast 1 characters")
+    author: Optional[AuthorStr] = Field(None, description="Author name must be at least 3 characters")
+    published_year: Optional[int] = Field(None, ge=1450, le=_CURRENT_YEAR, description="Year must be realistic")
     genre: Optional[Literal['fiction', 'non-fiction', 'science', 'history', 'other']] = Field(None, description="('fiction', 'non-fiction', 'science', 'history', 'other') one of these values should be provided")
-    available: Optional[bool] = None
-
-    # Custom validator for title
-    @field_validator("title")
-    def title_not_numeric(cls, v):
-        if v is not None and v.isdigit():
-            raise ValueError("Title cannot be only numbers")
-        return v
-
-    # Custom validator for author
-    @field_validator("author")
-    def author_no_digits(cls, v):
-        if v is not None and any(char.isdigit() for char in v):
-            raise ValueError("Author name cannot contain numbers")
-        return v
\ No newline at end of file
+    available: Optional[bool] = None
\ No newline at end of file
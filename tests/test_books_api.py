@@ -1,24 +1,55 @@
 import pytest
+import asyncio
+import json
 import logging
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import Column, ForeignKey, Integer, String, create_engine, event, select
+from sqlalchemy.engine.interfaces import CacheStats
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, declarative_base, relationship, sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# Point the app's own engine (used by startup DDL) at the test database too
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///./test.db"
 from DB.database import Base
-from DB.connection import get_db_session
+from DB.connection import DB_POOL_SIZE, DB_POOL_TIMEOUT, get_db_session, get_engine
 from main import app  # your FastAPI entrypoint file where router is included
-from models.model import Book
+from models.model import Book, BookStatus
+from utils import helpers
 
 
 # SQLite test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    query_cache_size=1200,  # Match the production compiled-SQL cache size
+)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create tables
-Base.metadata.drop_all(bind=engine)
-Base.metadata.create_all(bind=engine)
+# Async engine on the same file for the app under test. NullPool avoids reusing
+# connections across event loops (the TestClient's and the seeding fixtures').
+async_engine = create_async_engine(
+    "sqlite+aiosqlite:///./test.db", poolclass=NullPool, query_cache_size=1200
+)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+# WAL + relaxed fsync: commits no longer hit the disk synchronously, which
+# dominates the cost of a suite that commits on every request
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def _sqlite_pragmas(dbapi_conn, _):
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.close()
+
 
 # Fixture to provide a session
 @pytest.fixture(scope="function")
@@ -31,24 +62,38 @@ def db_session():
         session.close()
 
 
-@pytest.fixture(scope="function", autouse=True)
-def override_db_dependency(db_session):
-    # Override get_db_session in FastAPI to use the test session
-    app.dependency_overrides[get_db_session] = lambda: db_session
+async def override_get_db_session():
+    async with TestingAsyncSessionLocal() as session:
+        yield session
+        await session.commit()
+
 
+@pytest.fixture(scope="module", autouse=True)
+def override_db_dependency():
+    # Override get_db_session in FastAPI to use the test database (once per module)
+    app.dependency_overrides[get_db_session] = override_get_db_session
+    yield
+    app.dependency_overrides.pop(get_db_session, None)
 
-# Create schema once
-Base.metadata.drop_all(bind=engine)
-Base.metadata.create_all(bind=engine)
 
-client = TestClient(app)
+# Create schema once, fresh for every run, in a single transaction
+with engine.begin() as conn:
+    Base.metadata.drop_all(conn)
+    Base.metadata.create_all(conn, checkfirst=True)
 
 
 # ---------- Fixtures ----------
+@pytest.fixture(scope="module")
+def client():
+    """One TestClient (and one startup/shutdown cycle) for the whole module."""
+    with TestClient(app) as c:
+        yield c
+
+
 @pytest.fixture
 def sample_book(db_session):
     """Fixture to insert a book directly into DB before tests."""
-    db = TestingSessionLocal()
+    db = db_session
     book = Book(
         title="Test Driven Development",
         author="Kent Beck",
@@ -60,11 +105,54 @@ def sample_book(db_session):
     db.commit()
     db.refresh(book)
     yield book
+    # Remove the row again; (title, author) must stay unique across tests
+    db.delete(book)
+    db.commit()
+
+
+@pytest.fixture
+def sample_books():
+    """Fixture to seed several books in one batched insert; yields their ids."""
+    rows = [
+        {
+            "title": f"Keyset Book {i}",
+            "author": "Jane Doe",
+            "published_year": 2000 + i,
+            "genre": "fiction",
+            "available": True,
+        }
+        for i in range(3)
+    ]
+
+    async def seed():
+        async with TestingAsyncSessionLocal() as session:
+            return await helpers.bulk_create_books(session, rows)
+
+    ids = asyncio.run(seed())
+    yield ids
+    db = TestingSessionLocal()
+    db.query(Book).filter(Book.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
     db.close()
 
 
 # ---------- Tests ----------
-def test_add_book():
+def test_health(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ok"
+    assert data["database"] == "up"
+
+
+def test_engine_pool_settings():
+    # Production engine keeps a sized QueuePool instead of the 5 + 10 default
+    pool = get_engine().pool
+    assert pool.size() == DB_POOL_SIZE
+    assert pool.timeout() == DB_POOL_TIMEOUT
+
+
+def test_add_book(client):
     response = client.post(
         "/books/",
         json={
@@ -82,7 +170,25 @@ def test_add_book():
     assert data["message"] == "Sucessfully created"
 
 
-def test_add_duplicate_book(sample_book):
+def test_add_book_invalid_title_and_author(client):
+    response = client.post(
+        "/books/",
+        json={
+            "title": "1984",
+            "author": "R2D2 Droid",
+            "published_year": 2008,
+            "genre": "fiction",
+            "available": True
+        },
+    )
+    assert response.status_code == 422
+    data = response.json()
+    assert data["status"] is False
+    assert "Title cannot be only numbers" in data["message"]
+    assert "Author name cannot contain numbers" in data["message"]
+
+
+def test_add_duplicate_book(client, sample_book):
     response = client.post(
         "/books/",
         json={
@@ -99,15 +205,244 @@ def test_add_duplicate_book(sample_book):
     assert "Title and Author already present" in data["message"]
 
 
-def test_get_books(sample_book):
+def test_add_duplicate_book_case_insensitive(client, sample_book):
+    response = client.post(
+        "/books/",
+        json={
+            "title": "test driven development",
+            "author": "KENT BECK",
+            "published_year": 2003,
+            "genre": "science",
+            "available": True
+        },
+    )
+    assert response.status_code == 409
+    assert response.json()["status"] is False
+
+
+def test_add_duplicate_book_without_on_conflict(client, sample_book, monkeypatch):
+    # Dialects lacking ON CONFLICT fall back to insert-and-catch IntegrityError
+    monkeypatch.delitem(helpers._CONFLICT_INSERT_STMTS, "sqlite")
+    response = client.post(
+        "/books/",
+        json={
+            "title": "Test Driven Development",
+            "author": "Kent Beck",
+            "published_year": 2003,
+            "genre": "science",
+            "available": True
+        },
+    )
+    assert response.status_code == 409
+    assert response.json()["status"] is False
+
+
+def test_insert_without_on_conflict_reraises_other_violations(monkeypatch):
+    # Only the title/author constraint means "duplicate"; NOT NULL still raises
+    monkeypatch.delitem(helpers._CONFLICT_INSERT_STMTS, "sqlite")
+
+    async def insert_without_year():
+        async with TestingAsyncSessionLocal() as session:
+            await helpers.insert_book_if_absent(
+                {"title": "No Year", "author": "Someone", "genre": "other"}, session
+            )
+
+    with pytest.raises(IntegrityError, match="NOT NULL"):
+        asyncio.run(insert_without_year())
+
+
+def test_add_duplicate_book_served_from_cache(client, sample_book, monkeypatch):
+    # With the duplicate cache on, a repeated duplicate POST skips the INSERT
+    monkeypatch.setattr(helpers, "DUPLICATE_CACHE_TTL", 30)
+    monkeypatch.setattr(helpers, "_known_duplicates", helpers.OrderedDict())
+    inserts = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT"):
+            inserts.append(statement)
+
+    event.listen(async_engine.sync_engine, "after_cursor_execute", record)
+    try:
+        for _ in range(2):
+            response = client.post(
+                "/books/",
+                json={
+                    "title": "test driven development",
+                    "author": "KENT BECK",
+                    "published_year": 2003,
+                    "genre": "science",
+                    "available": True
+                },
+            )
+            assert response.status_code == 409
+    finally:
+        event.remove(async_engine.sync_engine, "after_cursor_execute", record)
+
+    assert len(inserts) == 1
+
+
+def test_duplicate_cache_forgets_renamed_book(client, sample_book, db_session, monkeypatch):
+    monkeypatch.setattr(helpers, "DUPLICATE_CACHE_TTL", 10)
+    monkeypatch.setattr(helpers, "_known_duplicates", helpers.OrderedDict())
+    payload = {
+        "title": "Test Driven Development",
+        "author": "Kent Beck",
+        "published_year": 2003,
+        "genre": "science",
+        "available": True
+    }
+    assert client.post("/books/", json=payload).status_code == 409
+
+    # Renaming the book frees its old title/author pair
+    response = client.put(f"/books/{sample_book.id}", json={"title": "TDD Renamed"})
+    assert response.status_code == 200
+    try:
+        assert client.post("/books/", json=payload).status_code == 201
+    finally:
+        db_session.query(Book).filter(
+            Book.title == "Test Driven Development", Book.id != sample_book.id
+        ).delete(synchronize_session=False)
+        db_session.commit()
+
+
+def test_add_book_insert_uses_statement_cache(client, sample_book):
+    # Dialects without this flag silently skip the compiled-SQL cache
+    assert async_engine.dialect.supports_statement_cache
+    cache_stats = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT"):
+            cache_stats.append(context.cache_hit)
+
+    event.listen(async_engine.sync_engine, "after_cursor_execute", record)
+    try:
+        for _ in range(2):
+            client.post(
+                "/books/",
+                json={
+                    "title": "Test Driven Development",
+                    "author": "Kent Beck",
+                    "published_year": 2003,
+                    "genre": "science",
+                    "available": True
+                },
+            )
+    finally:
+        event.remove(async_engine.sync_engine, "after_cursor_execute", record)
+
+    # The second POST reuses the compiled INSERT instead of recompiling it
+    assert cache_stats[-1] == CacheStats.CACHE_HIT
+
+
+def test_get_books(client, sample_book):
     response = client.get("/books/")
     assert response.status_code == 200
     data = response.json()
     assert data["status"] is True
     assert "items" in data["data"] or "data" in data["data"]
+    # The default listing is one bounded first page
+    assert data["data"]["pagination"]["limit"] == 50
+    assert data["data"]["pagination"]["after_id"] == 0
+
+
+def test_get_books_ndjson_stream(client, sample_book):
+    response = client.get("/books/", headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert any(row["id"] == sample_book.id for row in rows)
+
+
+def test_get_books_filter_by_author(client, sample_book):
+    response = client.get("/books/", params={"author": "kent b"})
+    assert response.status_code == 200
+    items = response.json()["data"]["data"]
+    assert items and all(item["author"] == "Kent Beck" for item in items)
+
+    # LIKE wildcards in the search term are matched literally
+    response = client.get("/books/", params={"author": "k_nt"})
+    assert response.json()["data"]["data"] == []
+
+
+def test_get_books_keyset_pagination(client, sample_books):
+    response = client.get(
+        "/books/", params={"genre": "fiction", "after_id": sample_books[0] - 1, "limit": 2}
+    )
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [item["id"] for item in data["data"]] == sample_books[:2]
+    cursor = data["pagination"]["next_cursor"]
+    assert cursor == sample_books[1]
+    assert "total_items" not in data["pagination"]
+
+    # Next page continues strictly after the cursor
+    response = client.get(
+        "/books/", params={"genre": "fiction", "after_id": cursor, "limit": 2}
+    )
+    assert [item["id"] for item in response.json()["data"]["data"]] == sample_books[2:]
+
+    # A cursor without a limit still returns a bounded page
+    response = client.get("/books/", params={"after_id": 0})
+    assert response.json()["data"]["pagination"]["limit"] == 50
+
+    # A limit without a cursor starts from the first book
+    response = client.get("/books/", params={"limit": 1})
+    data = response.json()["data"]
+    assert len(data["data"]) == 1
+    assert data["pagination"]["after_id"] == 0
 
 
-def test_get_book_by_id(sample_book):
+def test_get_books_include_total(client, sample_book):
+    response = client.get(
+        "/books/", params={"start": 0, "limit": 1, "include_total": True}
+    )
+    assert response.status_code == 200
+    pagination = response.json()["data"]["pagination"]
+    assert pagination["total_items"] >= 1
+    assert pagination["has_more"] is True  # a full page came back
+
+
+def test_eager_loader_hooks_with_relationship(monkeypatch):
+    # Throwaway mapping with a relationship, so Book's mapper is left untouched
+    ScratchBase = declarative_base()
+
+    class Shelf(ScratchBase):
+        __tablename__ = "shelves"
+        id = Column(Integer, primary_key=True)
+        name = Column(String(50))
+        slots = relationship("Slot")
+
+    class Slot(ScratchBase):
+        __tablename__ = "slots"
+        id = Column(Integer, primary_key=True)
+        shelf_id = Column(Integer, ForeignKey("shelves.id"))
+
+    monkeypatch.setattr(helpers, "LIST_EAGER_RELATIONSHIPS", ("slots",))
+    monkeypatch.setattr(helpers, "DETAIL_EAGER_RELATIONSHIPS", ("slots",))
+    # Column-only selects, like the prebuilt list/detail statements
+    list_stmt = helpers.apply_list_loaders(select(Shelf.id, Shelf.name), Shelf)
+    detail_stmt = helpers.apply_detail_loaders(
+        select(Shelf.id, Shelf.name).where(Shelf.id == 1), Shelf
+    )
+
+    scratch_engine = create_engine("sqlite://")
+    ScratchBase.metadata.create_all(scratch_engine)
+    with Session(scratch_engine) as session:
+        session.add(Shelf(id=1, name="top", slots=[Slot(), Slot()]))
+        session.commit()
+        session.expunge_all()
+
+        shelves = session.scalars(list_stmt).all()
+        assert "slots" in shelves[0].__dict__  # Loaded eagerly (selectinload)
+        session.expunge_all()
+
+        shelf = session.scalars(detail_stmt).unique().one()
+        assert "slots" in shelf.__dict__  # Loaded eagerly (joinedload)
+        assert len(shelf.slots) == 2
+    scratch_engine.dispose()
+
+
+def test_get_book_by_id(client, sample_book):
     response = client.get(f"/books/{sample_book.id}")
     assert response.status_code == 200
     data = response.json()
@@ -115,14 +450,36 @@ def test_get_book_by_id(sample_book):
     assert data["data"]["title"] == "Test Driven Development"
 
 
-def test_get_book_by_invalid_id():
+def test_get_book_by_id_conditional(client, sample_book):
+    response = client.get(f"/books/{sample_book.id}")
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "public, max-age=60"
+
+    response = client.get(f"/books/{sample_book.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # Weak comparison: a W/-prefixed tag in a list still matches
+    response = client.get(
+        f"/books/{sample_book.id}", headers={"If-None-Match": f'"other", W/{etag}'}
+    )
+    assert response.status_code == 304
+
+    # An update produces a new version, so the old ETag no longer matches
+    client.put(f"/books/{sample_book.id}", json={"available": False})
+    response = client.get(f"/books/{sample_book.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_get_book_by_invalid_id(client):
     response = client.get("/books/9999")
     assert response.status_code == 404
     data = response.json()
     assert data["status"] is False
 
 
-def test_update_book(sample_book):
+def test_update_book(client, sample_book):
     response = client.put(
         f"/books/{sample_book.id}",
         json={"title": "TDD Updated"}
@@ -135,7 +492,25 @@ def test_update_book(sample_book):
     assert data['data'].get('id') == sample_book.id
 
 
-def test_update_book_invalid_id():
+def test_update_book_no_changes(client, sample_book):
+    response = client.put(f"/books/{sample_book.id}", json={})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] is False
+    assert data["message"] == "No changes provided"
+    assert data["data"]["id"] == sample_book.id
+
+
+def test_update_book_to_existing_title_author(client, sample_book, sample_books):
+    response = client.put(
+        f"/books/{sample_books[0]}",
+        json={"title": "test driven development", "author": "Kent Beck"},
+    )
+    assert response.status_code == 409
+    assert response.json()["message"] == "Title and Author already present"
+
+
+def test_update_book_invalid_id(client):
     response = client.put("/books/9999", json={"title": "Does Not Exist"})
     assert response.status_code == 404
     data = response.json()
@@ -143,7 +518,7 @@ def test_update_book_invalid_id():
     assert data["status"] is False  # careful: your API returns success=True with "Not Found"
 
 
-def test_delete_book(sample_book, db_session):
+def test_delete_book(client, sample_book, db_session):
     # First delete
     response = client.delete(f"/books/{sample_book.id}")
     data = response.json()
@@ -159,5 +534,11 @@ def test_delete_book(sample_book, db_session):
     assert data["message"] == "Book is already terminated"
 
     # Optional: verify DB directly
-    book_in_db = db_session.query(Book).filter(Book.id == sample_book.id).first()
-    assert book_in_db.status.lower() == "terminated"
+    # (populate_existing: sample_book lives in this session's identity map)
+    book_in_db = (
+        db_session.query(Book)
+        .filter(Book.id == sample_book.id)
+        .populate_existing()
+        .first()
+    )
+    assert book_in_db.status == BookStatus.TERMINATED
@@ -1,25 +1,174 @@
-from sqlalchemy import func, exists
+from collections import OrderedDict
+from sqlalchemy import insert, lambda_stmt
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from models.model import Book
 
+import os
+import time
+
+
+# Envelopes are built as single dict literals (one allocation, no key inserts)
 
 def response_format_success(message: str, data: dict | None = None):
-    body = {"status": True, "message": message}
-    if data is not None:
-        body["data"] = data
-    return body
-
-def response_format_failure(message):
-    return {"message": message, "status": False}
-
-
-def find_by_title_author(title, author, session):
-    return session.query(
-        exists().where(
-            func.lower(Book.title) == title.lower(),
-        ).where(
-            func.lower(Book.author) == author.lower()
-        )
-    ).scalar()
+    if data is None:
+        return {"status": True, "message": message}
+    return {"status": True, "message": message, "data": data}
+
+def response_format_failure(message, data: dict | None = None):
+    if data is None:
+        return {"message": message, "status": False}
+    return {"message": message, "status": False, "data": data}
+
+
+# Book relationships to eager-load, by attribute name. Book has none yet; adding
+# one here keeps list and detail reads free of N+1 lazy loads. Column-only
+# selects load no relationships (and cannot take loader options), so once a
+# name is listed the hooks switch the statement to select Book entities.
+LIST_EAGER_RELATIONSHIPS: tuple[str, ...] = ()
+DETAIL_EAGER_RELATIONSHIPS: tuple[str, ...] = ()
+
+
+def apply_list_loaders(stmt, entity=Book):
+    # Many rows: one extra SELECT ... WHERE id IN (...) per relationship
+    if not LIST_EAGER_RELATIONSHIPS:
+        return stmt
+    return stmt.with_only_columns(entity).options(
+        *(selectinload(getattr(entity, name)) for name in LIST_EAGER_RELATIONSHIPS)
+    )
+
+
+def apply_detail_loaders(stmt, entity=Book):
+    # Single row: LEFT OUTER JOIN the relationships into the same query
+    if not DETAIL_EAGER_RELATIONSHIPS:
+        return stmt
+    return stmt.with_only_columns(entity).options(
+        *(joinedload(getattr(entity, name)) for name in DETAIL_EAGER_RELATIONSHIPS)
+    )
+
+
+def _insert_if_absent_stmt(dialect_insert):
+    # Core INSERT ... ON CONFLICT (title_lc, author_lc) DO NOTHING RETURNING id;
+    # other constraint violations still raise
+    return (
+        dialect_insert(Book.__table__)
+        .on_conflict_do_nothing(index_elements=["title_lc", "author_lc"])
+        .returning(Book.__table__.c.id)
+    )
+
+
+# Per-dialect duplicate-safe inserts. The dialect insert constructs provide no
+# cache key, so they are wrapped in lambda_stmt (keyed on the lambda itself) to
+# let the compiled SQL be reused instead of recompiled on every POST.
+# Rows are passed as execute() parameters, so no ORM instances or unit-of-work
+# bookkeeping are involved; a list of rows runs as one batched executemany.
+_CONFLICT_INSERT_STMTS = {
+    "postgresql": lambda_stmt(lambda: _insert_if_absent_stmt(postgresql_insert)),
+    "sqlite": lambda_stmt(lambda: _insert_if_absent_stmt(sqlite_insert)),
+}
+
+# Fallback for dialects without ON CONFLICT: plain insert, duplicates rejected
+# by the uq_books_title_author constraint
+_PLAIN_INSERT_STMT = insert(Book.__table__)
+
+
+def is_title_author_conflict(error: IntegrityError) -> bool:
+    # Drivers name the violated constraint (PostgreSQL, MySQL) or list its
+    # columns (SQLite); anything else is a different integrity failure
+    message = str(error.orig)
+    return (
+        "uq_books_title_author" in message
+        or "books.title_lc, books.author_lc" in message
+    )
+
+
+# Batched insert for seeding/imports; ids come back in input order
+_BULK_INSERT_STMT = insert(Book.__table__).returning(
+    Book.__table__.c.id, sort_by_parameter_order=True
+)
+
+
+async def bulk_create_books(session, rows: list[dict]) -> list[int]:
+    # One INSERT with many VALUES tuples ("insertmanyvalues") and a single commit,
+    # returning the new ids instead of refreshing each row
+    result = await session.execute(_BULK_INSERT_STMT, rows)
+    ids = list(result.scalars())
+    await session.commit()
+    return ids
+
+
+# Per-worker memory of (title, author) pairs the database already rejected, so
+# retried POSTs of a known duplicate skip the round-trip. Off unless
+# DUPLICATE_CACHE_TTL (seconds) is set; the unique constraint stays the source
+# of truth. A pair is freed when its book is renamed (PUT evicts it here, but
+# only in the worker that served the PUT) or hard-deleted, so the TTL is capped
+# to bound how long other workers may answer 409 for a freed pair.
+DUPLICATE_CACHE_MAX_TTL = 10
+DUPLICATE_CACHE_TTL = min(float(os.getenv("DUPLICATE_CACHE_TTL", 0)), DUPLICATE_CACHE_MAX_TTL)
+DUPLICATE_CACHE_SIZE = 4096
+_known_duplicates: OrderedDict[tuple[str, str], float] = OrderedDict()
+
+
+def _duplicate_key(title: str, author: str) -> tuple[str, str]:
+    return (title.lower(), author.lower())
+
+
+def duplicate_cache_enabled() -> bool:
+    return DUPLICATE_CACHE_TTL > 0
+
+
+def forget_duplicate(title: str, author: str):
+    # Called when a pair may have been freed (e.g. its book was renamed)
+    _known_duplicates.pop(_duplicate_key(title, author), None)
+
+
+def _is_known_duplicate(key: tuple[str, str]) -> bool:
+    expires_at = _known_duplicates.get(key)
+    if expires_at is None:
+        return False
+    if expires_at <= time.monotonic():
+        del _known_duplicates[key]
+        return False
+    _known_duplicates.move_to_end(key)
+    return True
+
+
+def _remember_duplicate(key: tuple[str, str]):
+    _known_duplicates[key] = time.monotonic() + DUPLICATE_CACHE_TTL
+    _known_duplicates.move_to_end(key)
+    if len(_known_duplicates) > DUPLICATE_CACHE_SIZE:
+        _known_duplicates.popitem(last=False)  # Evict least recently used
+
+
+async def insert_book_if_absent(values: dict, session):
+    # Single round-trip insert; returns the new id, or None when the
+    # case-insensitive (title, author) unique index already holds this book
+    key = None
+    if duplicate_cache_enabled():
+        key = _duplicate_key(values["title"], values["author"])
+        if _is_known_duplicate(key):
+            return None
+
+    stmt = _CONFLICT_INSERT_STMTS.get(session.get_bind().dialect.name)
+    if stmt is not None:
+        book_id = (await session.execute(stmt, values)).scalar()
+    else:
+        # Savepoint: a rejected insert only undoes itself, not the caller's transaction
+        try:
+            async with session.begin_nested():
+                result = await session.execute(_PLAIN_INSERT_STMT, values)
+        except IntegrityError as e:
+            if not is_title_author_conflict(e):
+                raise
+            book_id = None
+        else:
+            book_id = result.inserted_primary_key[0]
+
+    if book_id is None and key is not None:
+        _remember_duplicate(key)
+    return book_id
 
 